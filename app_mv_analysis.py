@@ -3,7 +3,12 @@ import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
 from datetime import datetime
+import io
 import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.compute as pc
+from numpy.lib.stride_tricks import sliding_window_view
 
 st.set_page_config(page_title="Analyse MV - Glissant 20min", page_icon="📊", layout="wide")
 
@@ -78,6 +83,12 @@ with st.sidebar:
     - > PEAK → -2×(écart)
     """)
 
+    only_a = st.checkbox(
+        "Ignorer Option B",
+        value=False,
+        help="Calcul et affichage de l'Option A seule (scoring B non calculé)"
+    )
+
 # ============================================
 # CHARGEMENT
 # ============================================
@@ -110,19 +121,100 @@ if uploaded_occ is None or uploaded_load is None:
 
     st.stop()
 
+def read_csv_bytes(raw, text_cols=(), float_cols=(), column_names=None, index_col=None):
+    """Lecture CSV ';' : parseur Arrow multi-thread, repli sur le moteur C si lignes / valeurs non conformes"""
+    column_types = {**{col: pa.string() for col in text_cols}, **{col: pa.float64() for col in float_cols}}
+    try:
+        table = pacsv.read_csv(
+            io.BytesIO(raw),
+            # Noms imposés : la ligne d'en-tête du fichier est sautée
+            read_options=pacsv.ReadOptions(column_names=column_names, skip_rows=1 if column_names else 0),
+            parse_options=pacsv.ParseOptions(delimiter=';'),
+            convert_options=pacsv.ConvertOptions(column_types=column_types)
+        )
+        df = table.to_pandas()
+        return df if index_col is None else df.set_index(df.columns[index_col])
+    except pa.ArrowInvalid:
+        return pd.read_csv(io.BytesIO(raw), sep=';', index_col=index_col, dtype={col: str for col in text_cols}, engine='c', low_memory=False)
+
+def read_occ_csv(raw):
+    """Lecture OCC : 1re colonne (Date) en index texte, colonnes minute typées float64"""
+    # Colonne Date nommée par position : en-tête vide (to_csv) ou absent (index implicite, repli pandas)
+    columns = ['Date'] + list(pd.read_csv(io.BytesIO(raw), sep=';', nrows=0).columns[1:])
+    minute_cols = [col for col in columns if 'Duration 11 Min' in col]
+    occ_df = read_csv_bytes(raw, text_cols=['Date'], float_cols=minute_cols, column_names=columns, index_col=0)
+    occ_df.index.name = 'Date'
+    return occ_df
+
+def read_load_csv(raw):
+    """Lecture LOAD : Date conservée en texte (clé de jointure avec OCC)"""
+    return read_csv_bytes(raw, text_cols=['Date'])
+
+def parse_load_column(col_name):
+    """Parse '10:20-11:20' → (10, 20) = heure début, minute début"""
+    try:
+        start_time = col_name.split('-')[0]
+        hour, minute = start_time.split(':')
+        return int(hour), int(minute)
+    except:
+        return None, None
+
+@st.cache_data(show_spinner=False)
+def load_occ(raw):
+    """OCC mis en cache par contenu : (dates, TV, matrice OCC jours × minutes)"""
+    occ_df = read_occ_csv(raw)
+    minute_cols = [col for col in occ_df.columns if 'Duration 11 Min' in col]
+
+    # Extraire OCC (1440 minutes) en float64 : valeurs non numériques / manquantes → 0
+    occ_minutes = occ_df[minute_cols]
+    if not all(pd.api.types.is_numeric_dtype(dtype) for dtype in occ_minutes.dtypes):
+        occ_minutes = occ_minutes.apply(pd.to_numeric, errors='coerce')
+    occ_matrix = np.nan_to_num(occ_minutes.to_numpy(dtype=np.float64), copy=False, nan=0.0)
+
+    # OCC = nombre d'avions : stockage int16 si aucune valeur fractionnaire (conversion sans perte)
+    if np.array_equal(occ_matrix, np.round(occ_matrix)) and np.abs(occ_matrix).max(initial=0) <= np.iinfo(np.int16).max:
+        occ_matrix = occ_matrix.astype(np.int16)
+
+    return occ_df.index.to_numpy(), occ_df['ID'].iloc[0], occ_matrix
+
+@st.cache_data(show_spinner=False)
+def load_load(raw):
+    """LOAD mis en cache par contenu : TV, colonnes LOAD, fenêtres valides (colonnes, heure / minute début), dates et charges"""
+    load_df = read_load_csv(raw)
+    load_cols = [col for col in load_df.columns if ':' in col and '-' in col]
+
+    # Fenêtres LOAD valides, parsées une seule fois : (colonnes, heure début, minute début)
+    parsed = [(col, *parse_load_column(col)) for col in load_cols]
+    parsed = [p for p in parsed if p[1] is not None]
+    window_cols = [p[0] for p in parsed]
+
+    # Charges par date (première ligne si doublon) : valeurs non numériques → NaN
+    load_unique = load_df.drop_duplicates('Date')
+    load_windows = load_unique[window_cols]
+    if not all(pd.api.types.is_numeric_dtype(dtype) for dtype in load_windows.dtypes):
+        load_windows = load_windows.apply(pd.to_numeric, errors='coerce')
+
+    return {
+        'tv': load_df['ID'].iloc[0],
+        'load_cols': load_cols,
+        'window_cols': window_cols,
+        'hour_starts': np.array([p[1] for p in parsed], dtype=np.int32),
+        'min_starts': np.array([p[2] for p in parsed], dtype=np.int32),
+        'dates': load_unique['Date'].to_numpy(),
+        'values': load_windows.to_numpy(dtype=np.float64)
+    }
+
 # Charger OCC
 try:
-    occ_df = pd.read_csv(uploaded_occ, sep=';', index_col=0)
-    occ_df.index.name = 'Date'
-    tv_occ = occ_df['ID'].iloc[0]
+    occ_dates, tv_occ, _ = load_occ(uploaded_occ.getvalue())
 except Exception as e:
     st.error(f"❌ Erreur OCC : {e}")
     st.stop()
 
 # Charger LOAD
 try:
-    load_df = pd.read_csv(uploaded_load, sep=';')
-    tv_load = load_df['ID'].iloc[0]
+    load_data = load_load(uploaded_load.getvalue())
+    tv_load, load_cols, load_dates = load_data['tv'], load_data['load_cols'], load_data['dates']
 
     if tv_load != tv_occ:
         st.warning(f"⚠️ TV différents : OCC={tv_occ}, LOAD={tv_load}")
@@ -134,45 +226,126 @@ except Exception as e:
     st.stop()
 
 # Vérifier format LOAD (glissant ?)
-load_cols = [col for col in load_df.columns if ':' in col and '-' in col]
 mode = "GLISSANT_20MIN" if len(load_cols) > 24 else "FIXE"
 
-st.success(f"✅ **{tv_detected}** | OCC: {len(occ_df)} jours | LOAD: {len(load_df)} jours | Mode: **{mode}** ({len(load_cols)} colonnes)")
+st.success(f"✅ **{tv_detected}** | OCC: {len(occ_dates)} jours | LOAD: {len(load_dates)} jours | Mode: **{mode}** ({len(load_cols)} colonnes)")
 
 # ============================================
 # FONCTIONS SCORING
 # ============================================
 
 def score_option_a(occ_minutes, sustain, tolerance):
-    """Option A : Dégradation linéaire"""
-    score = 0
-    for occ in occ_minutes:
-        if occ <= sustain + tolerance:
-            score += 1
-        else:
-            score -= (occ - sustain - tolerance)
-    return score
+    """Option A : Dégradation linéaire (score de chaque minute)"""
+    occ = np.asarray(occ_minutes)
+    ecart = occ - (sustain + tolerance)
+    return np.where(ecart <= 0, 1.0, -ecart)
 
 def score_option_b(occ_minutes, sustain, tolerance, peak):
-    """Option B : Trois zones"""
-    score = 0
-    for occ in occ_minutes:
-        if occ <= sustain + tolerance:
-            score += 1
-        elif occ <= peak:
-            score += 0
-        else:
-            score -= (occ - peak) * 2
-    return score
-
-def parse_load_column(col_name):
-    """Parse '10:20-11:20' → (10, 20) = heure début, minute début"""
+    """Option B : Trois zones (score de chaque minute)"""
+    occ = np.asarray(occ_minutes)
+    seuil = sustain + tolerance
+    return np.select([occ <= seuil, occ <= peak], [1.0, 0.0], default=-2.0 * (occ - peak))
+
+def sliding_sum(minute_values, start_idx, window=60):
+    """Somme des fenêtres [début, début + window) par somme cumulée (wrap minuit)"""
+    values = np.asarray(minute_values)
+    # Valeurs entières : sommes exactes en int32
+    acc = np.int32 if np.issubdtype(values.dtype, np.integer) else np.float64
+    padded = np.concatenate((values, values[..., :window]), axis=-1)
+    cumsum = np.zeros(padded.shape[:-1] + (padded.shape[-1] + 1,), dtype=acc)
+    np.cumsum(padded, axis=-1, dtype=acc, out=cumsum[..., 1:])
+    return cumsum[..., start_idx + window] - cumsum[..., start_idx]
+
+def sliding_mean(occ_minutes, start_idx, window=60):
+    """Moyenne OCC des fenêtres [début, début + window) (wrap minuit)"""
+    occ = np.asarray(occ_minutes)
+    if np.issubdtype(occ.dtype, np.integer):
+        return sliding_sum(occ, start_idx, window) / window
+    # OCC fractionnaire : moyenne de chaque fenêtre (copie contiguë) comme np.mean, une différence de cumuls décale les arrondis
+    padded = np.concatenate((occ, occ[..., :window]), axis=-1)
+    windows = np.ascontiguousarray(sliding_window_view(padded, window, axis=-1)[..., start_idx, :])
+    return windows.mean(axis=-1)
+
+def sliding_max(minute_values, start_idx, window=60):
+    """Max des fenêtres [début, début + window) par maxima de blocs (wrap minuit)"""
+    values = np.asarray(minute_values)
+    n = values.shape[-1]
+    # Blocs de minutes communs à toutes les fenêtres (20 min en glissant 20min)
+    step = np.gcd.reduce(np.concatenate((start_idx, [window, n])))
+    block_max = values.reshape(values.shape[:-1] + (n // step, step)).max(axis=-1)
+    block_idx = (start_idx[:, None] // step + np.arange(window // step)) % (n // step)
+    return block_max[..., block_idx].max(axis=-1)
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def compute_results(occ_bytes, load_bytes, sustain, peak, tolerance, with_b=True):
+    """Scores OCC et charges LOAD de chaque fenêtre 60 min (mis en cache par fichiers + seuils + options)"""
+    dates_arr, _, occ_matrix = load_occ(occ_bytes)
+    load_data = load_load(load_bytes)
+    window_cols, hour_starts, min_starts = load_data['window_cols'], load_data['hour_starts'], load_data['min_starts']
+    load_dates, load_values = load_data['dates'], load_data['values']
+
+    # Index minute début (0-1439) de chaque fenêtre
+    start_idx = (hour_starts * 60 + min_starts) % occ_matrix.shape[1]
+
+    # Jointure interne OCC / LOAD par Date : lignes OCC / lignes LOAD alignées (ordre OCC)
+    load_pos = pd.Index(load_dates).get_indexer(dates_arr)
+    occ_rows = np.flatnonzero(load_pos >= 0)
+    load_rows = load_pos[occ_rows]
+    n_days = len(occ_rows)
+    occ_days = occ_matrix[occ_rows]
+
+    # Scores : chaque minute évaluée une seule fois, puis sommée sur ses fenêtres (nb jours, nb fenêtres)
+    score_matrices = {'Score_A': sliding_sum(score_option_a(occ_days, sustain, tolerance), start_idx)}
+    if with_b:
+        score_matrices['Score_B'] = sliding_sum(score_option_b(occ_days, sustain, tolerance, peak), start_idx)
+    avg_matrix = sliding_mean(occ_days, start_idx)
+    max_matrix = sliding_max(occ_days, start_idx)
+
+    # Scores, stats OCC et charge LOAD : une ligne par (jour, fenêtre)
+    avg_out = avg_matrix.ravel()
+    max_out = max_matrix.ravel().astype(np.float64)
+    load_out = load_values[load_rows].ravel()
+
+    # Fenêtres sans charge LOAD exclues avant construction du DataFrame
+    mask = ~np.isnan(load_out)
+    columns = {
+        'Date': np.repeat(dates_arr[occ_rows], len(window_cols)),
+        'Window': np.tile(np.array(window_cols, dtype=object), n_days),
+        'Hour_Start': np.tile(hour_starts, n_days),
+        'Min_Start': np.tile(min_starts, n_days),
+        'Load': load_out,
+        **{name: matrix.ravel().round(2) for name, matrix in score_matrices.items()},
+        'Avg_OCC': avg_out.round(2),
+        'Max_OCC': max_out.round(2)
+    }
+    df_results = pd.DataFrame({name: values[mask] for name, values in columns.items()})
+
+    return df_results
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def results_to_csv(_df_results, occ_bytes, load_bytes, sustain, peak, tolerance, with_b):
+    """Export CSV UTF-8 écrit en octets par Arrow, au format de to_csv (mis en cache par fichiers + seuils + options)"""
+    # Hors [1e-4, 1e10), Arrow et repr n'écrivent pas les mêmes exposants : repli pandas
+    floats = np.abs(_df_results.select_dtypes('floating').to_numpy())
+    if np.any(((floats > 0) & (floats < 1e-4)) | ((floats >= 1e10) & np.isfinite(floats))):
+        return _df_results.to_csv(index=False).encode('utf-8')
+
+    table = pa.Table.from_pandas(_df_results, preserve_index=False)
+    for i, field in enumerate(table.schema):
+        if pa.types.is_floating(field.type):
+            text = pc.cast(table.column(i), pa.string())
+            # Flottants entiers écrits '19.0' comme to_csv (Arrow écrit '19')
+            whole = pc.match_substring_regex(text, r'^-?\d+$')
+            table = table.set_column(i, field.name, pc.if_else(whole, pc.binary_join_element_wise(text, '.0', ''), text))
+    # En-tête écrit à part : Arrow met toujours les noms de colonnes entre guillemets
+    buffer = io.BytesIO((','.join(_df_results.columns) + '\n').encode('utf-8'))
+    buffer.seek(0, io.SEEK_END)
     try:
-        start_time = col_name.split('-')[0]
-        hour, minute = start_time.split(':')
-        return int(hour), int(minute)
-    except:
-        return None, None
+        pacsv.write_csv(table, buffer, pacsv.WriteOptions(include_header=False, quoting_style='none'))
+    except pa.ArrowInvalid:
+        # Texte contenant ',' / '"' / saut de ligne : guillemets nécessaires, repli pandas
+        return _df_results.to_csv(index=False).encode('utf-8')
+    return buffer.getvalue()
 
 # ============================================
 # CALCUL
@@ -181,95 +354,40 @@ def parse_load_column(col_name):
 st.divider()
 if st.button("🚀 Calculer MV (glissant 20min)", type="primary", use_container_width=True):
 
-    with st.spinner(f"🔄 Calcul de {len(occ_df)} jours × {len(load_cols)} fenêtres..."):
-
-        # Colonnes OCC
-        minute_cols = [col for col in occ_df.columns if 'Duration 11 Min' in col]
-
-        results = []
-
-        # Pour chaque date
-        for date in occ_df.index:
-            row_occ = occ_df.loc[date]
-            row_load = load_df[load_df['Date'] == date]
-
-            if len(row_load) == 0:
-                continue
-
-            row_load = row_load.iloc[0]
-
-            # Extraire OCC (1440 minutes)
-            occ_values = []
-            for col in minute_cols:
-                try:
-                    occ_values.append(float(row_occ[col]))
-                except:
-                    occ_values.append(0)
-
-            # Pour chaque colonne LOAD
-            for load_col in load_cols:
-                hour_start, min_start = parse_load_column(load_col)
-
-                if hour_start is None:
-                    continue
-
-                # Index minute début (0-1439)
-                start_idx = hour_start * 60 + min_start
-                end_idx = start_idx + 60  # Fenêtre 60 min
-
-                # Extraire fenêtre OCC
-                if end_idx <= len(occ_values):
-                    occ_window = occ_values[start_idx:end_idx]
-                else:
-                    # Wrap around minuit
-                    occ_window = occ_values[start_idx:] + occ_values[:end_idx-len(occ_values)]
+    with st.spinner(f"🔄 Calcul de {len(occ_dates)} jours × {len(load_cols)} fenêtres..."):
 
-                # Scores
-                score_a = score_option_a(occ_window, sustain, tolerance)
-                score_b = score_option_b(occ_window, sustain, tolerance, peak)
+        # Option B ignorée : ni scoring B, ni onglets / stats B
+        with_b = not only_a
+        df_results = compute_results(uploaded_occ.getvalue(), uploaded_load.getvalue(), sustain, peak, tolerance, with_b)
 
-                # Charge LOAD
-                try:
-                    load_value = float(row_load[load_col])
-                except:
-                    load_value = None
-
-                # Stats OCC
-                avg_occ = np.mean(occ_window)
-                max_occ = np.max(occ_window)
-
-                results.append({
-                    'Date': date,
-                    'Window': load_col,
-                    'Hour_Start': hour_start,
-                    'Min_Start': min_start,
-                    'Load': load_value,
-                    'Score_A': round(score_a, 2),
-                    'Score_B': round(score_b, 2),
-                    'Avg_OCC': round(avg_occ, 2),
-                    'Max_OCC': round(max_occ, 2)
-                })
-
-        df_results = pd.DataFrame(results)
-        df_results = df_results[df_results['Load'].notna()]
-
-        st.success(f"✅ **{len(df_results)} fenêtres analysées** ({len(df_results)/len(occ_df):.0f} par jour)")
+        st.success(f"✅ **{len(df_results)} fenêtres analysées** ({len(df_results)/len(occ_dates):.0f} par jour)")
 
         # ============================================
         # STATISTIQUES
         # ============================================
 
+        # Colonnes NumPy partagées par les stats / MV (évite les DataFrames filtrés)
+        loads = df_results['Load'].to_numpy()
+        scores_a = df_results['Score_A'].to_numpy()
+        viable_loads_a = loads[scores_a > 30]
+        score_cols = [('Score_A', scores_a)]
+        if with_b:
+            scores_b = df_results['Score_B'].to_numpy()
+            viable_loads_b = loads[scores_b > 30]
+            score_cols.append(('Score_B', scores_b))
+
         st.markdown("### 📊 Vue d'ensemble")
 
         col1, col2, col3, col4 = st.columns(4)
 
         with col1:
-            viable_a = len(df_results[df_results['Score_A'] > 0])
-            st.metric("Viables (A)", f"{viable_a/len(df_results)*100:.1f}%")
+            st.metric("Viables (A)", f"{np.count_nonzero(scores_a > 0)/len(scores_a)*100:.1f}%")
 
         with col2:
-            viable_b = len(df_results[df_results['Score_B'] > 0])
-            st.metric("Viables (B)", f"{viable_b/len(df_results)*100:.1f}%")
+            if with_b:
+                st.metric("Viables (B)", f"{np.count_nonzero(scores_b > 0)/len(scores_b)*100:.1f}%")
+            else:
+                st.metric("Viables (B)", "—")
 
         with col3:
             avg_load = df_results['Load'].mean()
@@ -285,14 +403,21 @@ if st.button("🚀 Calculer MV (glissant 20min)", type="primary", use_container_
 
         st.markdown("### 📈 Graphiques Charge vs Score")
 
-        tab1, tab2, tab3 = st.tabs(["🔹 Option A", "🔸 Option B", "⚖️ Comparaison"])
+        # Infobulles : Date / fenêtre en customdata, Load / Score lus sur x / y
+        hover_data = np.column_stack((df_results['Date'].to_numpy(), df_results['Window'].to_numpy()))
+        hover_template = '%{customdata[0]}<br>%{customdata[1]}<br>Load: %{x}<br>Score: %{y}<extra></extra>'
+
+        if with_b:
+            tab1, tab2, tab3 = st.tabs(["🔹 Option A", "🔸 Option B", "⚖️ Comparaison"])
+        else:
+            tab1, = st.tabs(["🔹 Option A"])
 
         with tab1:
             st.markdown(f"**Option A : Dégradation linéaire** (seuil = {sustain + tolerance} av/min)")
 
             fig1 = go.Figure()
 
-            fig1.add_trace(go.Scatter(
+            fig1.add_trace(go.Scattergl(
                 x=df_results['Load'],
                 y=df_results['Score_A'],
                 mode='markers',
@@ -305,9 +430,8 @@ if st.button("🚀 Calculer MV (glissant 20min)", type="primary", use_container_
                     opacity=0.5,
                     line=dict(width=0)
                 ),
-                text=[f"{row['Date']}<br>{row['Window']}<br>Load: {row['Load']}<br>Score: {row['Score_A']}" 
-                      for _, row in df_results.iterrows()],
-                hovertemplate='%{text}<extra></extra>',
+                customdata=hover_data,
+                hovertemplate=hover_template,
                 name='Fenêtres'
             ))
 
@@ -333,96 +457,94 @@ if st.button("🚀 Calculer MV (glissant 20min)", type="primary", use_container_
                 min_score_a = df_results['Score_A'].min()
                 st.metric("Score min", f"{min_score_a:.1f}")
             with col3:
-                viable_df_a = df_results[df_results['Score_A'] > 30]
-                if len(viable_df_a) > 0:
-                    mv_a = viable_df_a['Load'].quantile(0.75)
+                if len(viable_loads_a) > 0:
+                    mv_a = np.percentile(viable_loads_a, 75)
                     st.metric("MV (P75)", f"{mv_a:.0f} av/h")
 
-        with tab2:
-            st.markdown(f"**Option B : Trois zones** (seuil = {sustain + tolerance}, PEAK = {peak} av/min)")
-
-            fig2 = go.Figure()
-
-            fig2.add_trace(go.Scatter(
-                x=df_results['Load'],
-                y=df_results['Score_B'],
-                mode='markers',
-                marker=dict(
-                    size=5,
-                    color=df_results['Score_B'],
-                    colorscale='RdYlGn',
-                    showscale=True,
-                    colorbar=dict(title="Score"),
-                    opacity=0.5,
-                    line=dict(width=0)
-                ),
-                text=[f"{row['Date']}<br>{row['Window']}<br>Load: {row['Load']}<br>Score: {row['Score_B']}" 
-                      for _, row in df_results.iterrows()],
-                hovertemplate='%{text}<extra></extra>',
-                name='Fenêtres'
-            ))
-
-            fig2.add_hline(y=0, line_dash="dash", line_color="red", line_width=2,
-                          annotation_text="Seuil viabilité")
-
-            fig2.update_layout(
-                title=f"Charge LOAD vs Score OCC (Option B) - {tv_detected}",
-                xaxis_title="Charge horaire (avions/heure)",
-                yaxis_title="Score OCC (max = 60)",
-                height=550,
-                showlegend=False
-            )
-
-            st.plotly_chart(fig2, use_container_width=True)
-
-            # Stats B
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                avg_score_b = df_results['Score_B'].mean()
-                st.metric("Score moyen", f"{avg_score_b:.1f}")
-            with col2:
-                min_score_b = df_results['Score_B'].min()
-                st.metric("Score min", f"{min_score_b:.1f}")
-            with col3:
-                viable_df_b = df_results[df_results['Score_B'] > 30]
-                if len(viable_df_b) > 0:
-                    mv_b = viable_df_b['Load'].quantile(0.75)
-                    st.metric("MV (P75)", f"{mv_b:.0f} av/h")
-
-        with tab3:
-            st.markdown("**Comparaison Option A vs Option B**")
-
-            fig3 = go.Figure()
-
-            fig3.add_trace(go.Scatter(
-                x=df_results['Load'],
-                y=df_results['Score_A'],
-                mode='markers',
-                name='Option A',
-                marker=dict(size=4, color='#1f77b4', opacity=0.4)
-            ))
-
-            fig3.add_trace(go.Scatter(
-                x=df_results['Load'],
-                y=df_results['Score_B'],
-                mode='markers',
-                name='Option B',
-                marker=dict(size=4, color='#ff7f0e', opacity=0.4)
-            ))
-
-            fig3.add_hline(y=0, line_dash="dash", line_color="red", line_width=2)
-
-            fig3.update_layout(
-                title="Superposition A vs B",
-                xaxis_title="Charge (av/h)",
-                yaxis_title="Score OCC",
-                height=500
-            )
-
-            st.plotly_chart(fig3, use_container_width=True)
-
-            corr = df_results['Score_A'].corr(df_results['Score_B'])
-            st.info(f"🔗 Corrélation A-B : **{corr:.3f}**")
+        if with_b:
+            with tab2:
+                st.markdown(f"**Option B : Trois zones** (seuil = {sustain + tolerance}, PEAK = {peak} av/min)")
+
+                fig2 = go.Figure()
+
+                fig2.add_trace(go.Scattergl(
+                    x=df_results['Load'],
+                    y=df_results['Score_B'],
+                    mode='markers',
+                    marker=dict(
+                        size=5,
+                        color=df_results['Score_B'],
+                        colorscale='RdYlGn',
+                        showscale=True,
+                        colorbar=dict(title="Score"),
+                        opacity=0.5,
+                        line=dict(width=0)
+                    ),
+                    customdata=hover_data,
+                    hovertemplate=hover_template,
+                    name='Fenêtres'
+                ))
+
+                fig2.add_hline(y=0, line_dash="dash", line_color="red", line_width=2,
+                              annotation_text="Seuil viabilité")
+
+                fig2.update_layout(
+                    title=f"Charge LOAD vs Score OCC (Option B) - {tv_detected}",
+                    xaxis_title="Charge horaire (avions/heure)",
+                    yaxis_title="Score OCC (max = 60)",
+                    height=550,
+                    showlegend=False
+                )
+
+                st.plotly_chart(fig2, use_container_width=True)
+
+                # Stats B
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    avg_score_b = df_results['Score_B'].mean()
+                    st.metric("Score moyen", f"{avg_score_b:.1f}")
+                with col2:
+                    min_score_b = df_results['Score_B'].min()
+                    st.metric("Score min", f"{min_score_b:.1f}")
+                with col3:
+                    if len(viable_loads_b) > 0:
+                        mv_b = np.percentile(viable_loads_b, 75)
+                        st.metric("MV (P75)", f"{mv_b:.0f} av/h")
+
+            with tab3:
+                st.markdown("**Comparaison Option A vs Option B**")
+
+                fig3 = go.Figure()
+
+                fig3.add_trace(go.Scattergl(
+                    x=df_results['Load'],
+                    y=df_results['Score_A'],
+                    mode='markers',
+                    name='Option A',
+                    marker=dict(size=4, color='#1f77b4', opacity=0.4)
+                ))
+
+                fig3.add_trace(go.Scattergl(
+                    x=df_results['Load'],
+                    y=df_results['Score_B'],
+                    mode='markers',
+                    name='Option B',
+                    marker=dict(size=4, color='#ff7f0e', opacity=0.4)
+                ))
+
+                fig3.add_hline(y=0, line_dash="dash", line_color="red", line_width=2)
+
+                fig3.update_layout(
+                    title="Superposition A vs B",
+                    xaxis_title="Charge (av/h)",
+                    yaxis_title="Score OCC",
+                    height=500
+                )
+
+                st.plotly_chart(fig3, use_container_width=True)
+
+                corr = np.corrcoef(scores_a, scores_b)[0, 1]
+                st.info(f"🔗 Corrélation A-B : **{corr:.3f}**")
 
         # ============================================
         # ANALYSE TRANCHES
@@ -430,16 +552,35 @@ if st.button("🚀 Calculer MV (glissant 20min)", type="primary", use_container_
 
         st.markdown("### 📊 Analyse par tranche de charge")
 
-        df_results['Load_Bucket'] = pd.cut(
-            df_results['Load'], 
-            bins=[0, 20, 30, 40, 50, 60, 70, 200],
-            labels=['0-20', '20-30', '30-40', '40-50', '50-60', '60-70', '70+']
-        )
-
-        tranches = df_results.groupby('Load_Bucket').agg({
-            'Score_A': ['mean', 'min', 'max', 'count'],
-            'Score_B': ['mean', 'min', 'max']
-        }).round(1)
+        # Tranche de chaque fenêtre, intervalles ]a, b] comme pd.cut (hors tranches → -1)
+        bucket_bins = np.array([0, 20, 30, 40, 50, 60, 70, 200])
+        bucket_labels = ['0-20', '20-30', '30-40', '40-50', '50-60', '60-70', '70+']
+        n_buckets = len(bucket_labels)
+
+        bucket = np.digitize(loads, bucket_bins, right=True) - 1
+        in_bucket = (bucket >= 0) & (bucket < n_buckets)
+        bucket[~in_bucket] = -1
+        df_results['Load_Bucket'] = pd.Categorical.from_codes(bucket, categories=bucket_labels)
+
+        # Moyenne / min / max par tranche (bincount + ufunc.at, sans groupby)
+        b = bucket[in_bucket]
+        counts = np.bincount(b, minlength=n_buckets)
+        empty = counts == 0
+        tranches = {}
+        for name, scores in score_cols:
+            values = scores[in_bucket]
+            sums = np.bincount(b, weights=values, minlength=n_buckets)
+            mins = np.full(n_buckets, np.inf)
+            maxs = np.full(n_buckets, -np.inf)
+            np.minimum.at(mins, b, values)
+            np.maximum.at(maxs, b, values)
+            tranches[(name, 'mean')] = np.where(empty, np.nan, sums / np.maximum(counts, 1))
+            tranches[(name, 'min')] = np.where(empty, np.nan, mins)
+            tranches[(name, 'max')] = np.where(empty, np.nan, maxs)
+            if name == 'Score_A':
+                tranches[(name, 'count')] = counts
+
+        tranches = pd.DataFrame(tranches, index=pd.Index(bucket_labels, name='Load_Bucket')).round(1)
 
         st.dataframe(tranches, use_container_width=True)
 
@@ -462,12 +603,8 @@ if st.button("🚀 Calculer MV (glissant 20min)", type="primary", use_container_
         with col1:
             st.markdown("#### 🔹 Option A")
 
-            viable_loads_a = df_results[df_results['Score_A'] > 30]['Load']
-
             if len(viable_loads_a) > 10:
-                mv_p50_a = viable_loads_a.quantile(0.50)
-                mv_p80_a = viable_loads_a.quantile(0.80)
-                mv_p90_a = viable_loads_a.quantile(0.90)
+                mv_p50_a, mv_p80_a, mv_p90_a = np.percentile(viable_loads_a, [50, 80, 90])
 
                 st.metric("MV P50", f"{mv_p50_a:.0f} av/h", help="Conservateur")
                 st.metric("MV P80 ⭐", f"{mv_p80_a:.0f} av/h", help="Recommandé")
@@ -480,12 +617,10 @@ if st.button("🚀 Calculer MV (glissant 20min)", type="primary", use_container_
         with col2:
             st.markdown("#### 🔸 Option B")
 
-            viable_loads_b = df_results[df_results['Score_B'] > 30]['Load']
-
-            if len(viable_loads_b) > 10:
-                mv_p50_b = viable_loads_b.quantile(0.50)
-                mv_p80_b = viable_loads_b.quantile(0.80)
-                mv_p90_b = viable_loads_b.quantile(0.90)
+            if not with_b:
+                st.info("Option B ignorée")
+            elif len(viable_loads_b) > 10:
+                mv_p50_b, mv_p80_b, mv_p90_b = np.percentile(viable_loads_b, [50, 80, 90])
 
                 st.metric("MV P50", f"{mv_p50_b:.0f} av/h", help="Conservateur")
                 st.metric("MV P80 ⭐", f"{mv_p80_b:.0f} av/h", help="Recommandé")
@@ -520,20 +655,21 @@ if st.button("🚀 Calculer MV (glissant 20min)", type="primary", use_container_
             st.plotly_chart(fig_hist_a, use_container_width=True)
 
         with col2:
-            fig_hist_b = go.Figure()
-            fig_hist_b.add_trace(go.Histogram(
-                x=df_results['Score_B'],
-                nbinsx=30,
-                marker_color='#ff7f0e',
-                name='Option B'
-            ))
-            fig_hist_b.update_layout(
-                title="Distribution Score B",
-                xaxis_title="Score",
-                yaxis_title="Nombre de fenêtres",
-                height=300
-            )
-            st.plotly_chart(fig_hist_b, use_container_width=True)
+            if with_b:
+                fig_hist_b = go.Figure()
+                fig_hist_b.add_trace(go.Histogram(
+                    x=df_results['Score_B'],
+                    nbinsx=30,
+                    marker_color='#ff7f0e',
+                    name='Option B'
+                ))
+                fig_hist_b.update_layout(
+                    title="Distribution Score B",
+                    xaxis_title="Score",
+                    yaxis_title="Nombre de fenêtres",
+                    height=300
+                )
+                st.plotly_chart(fig_hist_b, use_container_width=True)
 
         # ============================================
         # EXPORT
@@ -542,7 +678,7 @@ if st.button("🚀 Calculer MV (glissant 20min)", type="primary", use_container_
         st.divider()
         st.markdown("### 💾 Export")
 
-        csv_export = df_results.to_csv(index=False).encode('utf-8')
+        csv_export = results_to_csv(df_results, uploaded_occ.getvalue(), uploaded_load.getvalue(), sustain, peak, tolerance, with_b)
         st.download_button(
             label="📥 Télécharger tous les résultats (CSV)",
             data=csv_export,